@@ -20,14 +20,34 @@
 # SOFTWARE.
 
 
+import gzip
+import io
+import json
+import os
+import tarfile
+import tempfile
 import unittest
+import zipfile
+from concurrent.futures import wait
+from unittest.mock import MagicMock, patch
 
 import fsspec
 import numpy as np
 import xarray as xr
-from xcube.core.store import new_data_store
+from xcube.core.store import DataStoreError, new_data_store
 
-from xcube_zenodo.preload import recursive_listdir
+from xcube_zenodo.constants import TEMP_PROCESSING_FOLDER
+from xcube_zenodo.preload import (
+    ZenodoPreloadHandle,
+    _ProgressThrottle,
+    _read_ahead,
+    group_archive_members,
+    recursive_listdir,
+)
+
+CACHE_ROOT = "zenodo_cache/1234567"
+PROCESS_ROOT = f"{TEMP_PROCESSING_FOLDER}/{CACHE_ROOT}"
+RECORD_URL = "https://zenodo.org/records/1234567/files"
 
 
 class ZenodoDataStoreTest(unittest.TestCase):
@@ -56,3 +76,247 @@ class ZenodoDataStoreTest(unittest.TestCase):
             if "created" in file_info:
                 file_info.pop("created")
         self.assertCountEqual(expected, files_info)
+
+    def test_group_archive_members(self):
+        members = [
+            "readme.txt",
+            "level1/test.tif",
+            "test.zarr/.zattrs",
+            "test.zarr/.zgroup",
+            "test.zarr/var/.zattrs",
+            "test.zarr/var/0.0",
+            "../outside.tif",
+        ]
+        self.assertEqual(
+            {
+                "readme.txt": ["readme.txt"],
+                "level1/test.tif": ["level1/test.tif"],
+                "test.zarr": [
+                    "test.zarr/.zattrs",
+                    "test.zarr/.zgroup",
+                    "test.zarr/var/.zattrs",
+                    "test.zarr/var/0.0",
+                ],
+            },
+            group_archive_members(members),
+        )
+
+    def test_read_ahead(self):
+        data = bytes(range(256)) * 10000
+        with _read_ahead(io.BytesIO(data), max_chunks=2) as stream:
+            self.assertEqual(data, stream.read())
+            self.assertEqual(b"", stream.read())
+
+    def test_progress_throttle(self):
+        throttle = _ProgressThrottle(min_step=0.01, min_interval=60)
+        self.assertTrue(throttle.is_due(0.0))
+        self.assertFalse(throttle.is_due(0.005))
+        self.assertTrue(throttle.is_due(0.01))
+        self.assertFalse(throttle.is_due(0.015))
+
+
+class _RawStream(io.BytesIO):
+    """Stands in for the raw stream of a streamed response."""
+
+    decode_content = False
+
+
+def _mock_response(status_code: int, content: bytes = b"", etag: str = '"v1"'):
+    response = MagicMock()
+    response.status_code = status_code
+    response.ok = status_code < 400
+    response.headers = {"content-length": str(len(content)), "etag": etag}
+    response.raw = _RawStream(content)
+    return response
+
+
+def _write_file(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+class ZenodoPreloadHandleTest(unittest.TestCase):
+
+    def setUp(self):
+        # the processing folder is relative to the working directory
+        cwd = os.getcwd()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        os.chdir(tmp_dir.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def new_handle(self, *data_ids: str, **preload_params) -> ZenodoPreloadHandle:
+        cache_store = new_data_store("file", root=CACHE_ROOT, max_depth=10)
+        handle = ZenodoPreloadHandle(
+            cache_store,
+            *(f"{RECORD_URL}/{data_id}" for data_id in data_ids),
+            silent=True,
+            **preload_params,
+        )
+        self.addCleanup(handle.close)
+        return handle
+
+    @staticmethod
+    def write_manifest(manifest: dict):
+        os.makedirs(PROCESS_ROOT, exist_ok=True)
+        with open(f"{PROCESS_ROOT}/.manifest.json", "w") as file:
+            json.dump(manifest, file)
+
+    def write_partial_download(self):
+        _write_file(f"{PROCESS_ROOT}/test.nc", b"abc")
+        self.write_manifest(
+            {"test.nc": {"stage": "download", "etag": '"v1"', "downloaded": 3}}
+        )
+
+    @patch("xcube_zenodo.preload._SESSION.get")
+    def test_resume_download(self, mock_get):
+        self.write_partial_download()
+        mock_get.return_value.__enter__.return_value = _mock_response(206, b"def")
+
+        self.new_handle("test.nc")
+        mock_get.assert_called_once_with(
+            f"{RECORD_URL}/test.nc",
+            stream=True,
+            headers={"Range": "bytes=3-", "If-Range": '"v1"'},
+        )
+        self.assertEqual(b"abcdef", _read_file(f"{CACHE_ROOT}/test.nc"))
+
+    @patch("xcube_zenodo.preload._SESSION.get")
+    def test_resume_download_file_changed(self, mock_get):
+        self.write_partial_download()
+        # the ETag differs, so the server ignores the range and sends the file
+        mock_get.return_value.__enter__.return_value = _mock_response(
+            200, b"new", etag='"v2"'
+        )
+
+        self.new_handle("test.nc")
+        self.assertEqual(b"new", _read_file(f"{CACHE_ROOT}/test.nc"))
+
+    @patch("xcube_zenodo.preload._SESSION.get")
+    def test_resume_download_completed(self, mock_get):
+        self.write_partial_download()
+        mock_get.return_value.__enter__.return_value = _mock_response(416)
+
+        self.new_handle("test.nc")
+        self.assertEqual(b"abc", _read_file(f"{CACHE_ROOT}/test.nc"))
+
+    @patch("xcube_zenodo.preload._SESSION.get")
+    def test_resume_interrupted_prepare(self, mock_get):
+        # the preload was interrupted while copying the extracted archive into
+        # the cache, so the partial data in the cache must not be reused
+        _write_file(f"{PROCESS_ROOT}/andorra/data.tif", b"tif")
+        _write_file(f"{CACHE_ROOT}/andorra/data.tif", b"t")
+        self.write_manifest({"andorra.zip": {"stage": "prepare"}})
+
+        self.new_handle("andorra.zip")
+        mock_get.assert_not_called()
+        self.assertEqual(b"tif", _read_file(f"{CACHE_ROOT}/andorra.tif"))
+
+    @patch("xcube_zenodo.preload._SESSION.get")
+    def test_restart_failed_prepare(self, mock_get):
+        _write_file(f"{PROCESS_ROOT}/andorra/a.tif", b"a")
+        _write_file(f"{PROCESS_ROOT}/andorra/b.tif", b"b")
+        self.write_manifest({"andorra.zip": {"stage": "prepare"}})
+        copy_file = ZenodoPreloadHandle._copy_file
+
+        def copy_file_or_fail(handle, source_data_id, *args, **kwargs):
+            if source_data_id.endswith("b.tif"):
+                raise OSError("disk full")
+            copy_file(handle, source_data_id, *args, **kwargs)
+
+        with patch.object(
+            ZenodoPreloadHandle,
+            "_copy_file",
+            autospec=True,
+            side_effect=copy_file_or_fail,
+        ):
+            self.new_handle("andorra.zip")
+        self.assertEqual(["a.tif"], os.listdir(f"{CACHE_ROOT}/andorra"))
+
+        # the partial data in the cache must not be taken as preloaded
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zip_file:
+            zip_file.writestr("a.tif", b"a")
+            zip_file.writestr("b.tif", b"b")
+        mock_get.return_value.__enter__.return_value = _mock_response(
+            200, archive.getvalue()
+        )
+        self.new_handle("andorra.zip")
+        mock_get.assert_called_once()
+        self.assertEqual(b"b", _read_file(f"{CACHE_ROOT}/andorra/b.tif"))
+
+    @staticmethod
+    def write_tar(data_id: str, mode: str):
+        os.makedirs(PROCESS_ROOT, exist_ok=True)
+        with tarfile.open(f"{PROCESS_ROOT}/{data_id}", mode) as tar_file:
+            info = tarfile.TarInfo("data.tif")
+            info.size = 3
+            tar_file.addfile(info, io.BytesIO(b"tif"))
+
+    def test_extract_archive_tar(self):
+        handle = self.new_handle()
+        for data_id, mode in [("plain.tar", "w"), ("compressed.tar.gz", "w:gz")]:
+            with self.subTest(data_id=data_id):
+                self.write_tar(data_id, mode)
+                # as left by a preload with rapidgzip installed
+                with patch("xcube_zenodo.preload.rapidgzip", None):
+                    handle._extract_archive(data_id, f"{PROCESS_ROOT}/{data_id}")
+                dirname = data_id.split(".")[0]
+                self.assertEqual(
+                    b"tif", _read_file(f"{PROCESS_ROOT}/{dirname}/data.tif")
+                )
+
+    @patch("xcube_zenodo.preload.rapidgzip")
+    def test_extract_archive_tar_gz_rapidgzip(self, mock_rapidgzip):
+        mock_rapidgzip.open.side_effect = lambda file, parallelization: gzip.open(file)
+        handle = self.new_handle()
+        self.write_tar("data.tar.gz", "w:gz")
+
+        handle._extract_archive("data.tar.gz", f"{PROCESS_ROOT}/data.tar.gz")
+        mock_rapidgzip.open.assert_called_once()
+        self.assertEqual(b"tif", _read_file(f"{PROCESS_ROOT}/data/data.tif"))
+
+    def test_extract_archive_unsupported(self):
+        handle = self.new_handle()
+        with self.assertRaises(DataStoreError):
+            handle._extract_archive("data.nc", f"{PROCESS_ROOT}/data.nc")
+
+    def test_clean_up_keeps_unfinished_preloads(self):
+        handle = self.new_handle()
+        os.makedirs(f"{PROCESS_ROOT}/finished")
+        for file_name in ["finished.zip", "partial.zip", "broken.zip", "orphan.nc"]:
+            _write_file(f"{PROCESS_ROOT}/{file_name}", b"data")
+        handle._update_manifest("finished.zip", stage="done")
+        handle._update_manifest("partial.zip", stage="download", downloaded=4)
+        handle._update_manifest("broken.zip", stage="failed")
+
+        handle._clean_up()
+        wait(handle._cleanup_futures)
+        self.assertCountEqual(
+            [".manifest.json", "partial.zip"], os.listdir(PROCESS_ROOT)
+        )
+        self.assertEqual(
+            {
+                "partial.zip": {"stage": "download", "downloaded": 4},
+                "broken.zip": {"stage": "failed"},
+            },
+            handle._read_manifest(),
+        )
+
+        handle._clean_up(completed_only=False)
+        wait(handle._cleanup_futures)
+        self.assertEqual([], os.listdir(os.path.dirname(PROCESS_ROOT)))
+
+    def test_clean_up_deletes_leftover_trash(self):
+        # left behind by a preload whose process was killed
+        _write_file(f"{PROCESS_ROOT}.deadbeef.trash/test.nc", b"data")
+
+        handle = self.new_handle()
+        wait(handle._cleanup_futures)
+        self.assertFalse(os.path.exists(f"{PROCESS_ROOT}.deadbeef.trash"))
@@ -36,6 +36,7 @@ from xcube.core.store.preload import PreloadStatus
 from xcube.util.jsonschema import JsonObjectSchema
 
 from xcube_zenodo.constants import DATA_STORE_ID
+from xcube_zenodo.store import ZenodoDataStore
 
 
 class ZenodoDataStoreTest(unittest.TestCase):
@@ -57,6 +58,8 @@ class ZenodoDataStoreTest(unittest.TestCase):
         self.assertIn("cache_store_params", schema.properties)
         self.assertNotIn("cache_store_id", schema.required)
         self.assertNotIn("cache_store_params", schema.required)
+        self.assertIn("use_cache", schema.properties)
+        self.assertIn("use_block_cache", schema.properties)
 
     def test_get_data_types(self):
         store = new_data_store(DATA_STORE_ID, root=self.record_id)
@@ -74,7 +77,7 @@ class ZenodoDataStoreTest(unittest.TestCase):
         )
         mock_get_data_types.assert_called_once_with("test.tif")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_data_ids(self, mock_get):
         # Mock response from Zenodo API
         mock_response = MagicMock()
@@ -83,13 +86,12 @@ class ZenodoDataStoreTest(unittest.TestCase):
                 {"key": "planet_canopy_cover_30m_v0.1.tif"},
                 {"key": "planet_agb_30m_v0.1.tif"},
                 {"key": "planet_canopy_height_30m_v0.1.tif"},
+                {"key": "README.md"},
             ]
         }
         mock_response.status_code = 200
         mock_get.return_value = mock_response
-        store = new_data_store(DATA_STORE_ID, root="8154445")
-        # Mock the internal `_https_data_store.has_data` to always return True
-        store._https_data_store.has_data = lambda key: True
+        store = new_data_store(DATA_STORE_ID, root="8154445", use_cache=False)
 
         self.assertCountEqual(
             [
@@ -100,7 +102,7 @@ class ZenodoDataStoreTest(unittest.TestCase):
             store.get_data_ids(),
         )
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_data_ids_compressed(self, mock_get):
         # Mock response from Zenodo API
         mock_response = MagicMock()
@@ -113,7 +115,7 @@ class ZenodoDataStoreTest(unittest.TestCase):
         }
         mock_response.status_code = 200
         mock_get.return_value = mock_response
-        store = new_data_store(DATA_STORE_ID, root="8154445")
+        store = new_data_store(DATA_STORE_ID, root="8154445", use_cache=False)
 
         self.assertCountEqual(
             [
@@ -124,6 +126,81 @@ class ZenodoDataStoreTest(unittest.TestCase):
             store.get_data_ids(),
         )
 
+    @patch("requests.Session.get")
+    def test_get_data_ids_include_attrs(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "files": [
+                {"key": "data.zip", "size": 1024, "checksum": "md5:abc"},
+                {"key": "data.tif", "size": 2048, "checksum": "md5:def"},
+            ]
+        }
+        mock_response.status_code = 200
+        mock_get.return_value = mock_response
+        store = new_data_store(DATA_STORE_ID, root="8154445", use_cache=False)
+
+        self.assertEqual(
+            [("data.zip", {"size": 1024}), ("data.tif", {"size": 2048})],
+            list(store.get_data_ids(include_attrs=["size", "title"])),
+        )
+
+    @patch("requests.Session.get")
+    def test_get_data_ids_data_type(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "files": [{"key": "data.zip"}, {"key": "data.tif"}]
+        }
+        mock_response.status_code = 200
+        mock_get.return_value = mock_response
+        store = new_data_store(DATA_STORE_ID, root="8154445", use_cache=False)
+
+        self.assertEqual(
+            ["data.zip", "data.tif"], list(store.get_data_ids(data_type="dataset"))
+        )
+        self.assertEqual(["data.tif"], list(store.get_data_ids(data_type="mldataset")))
+
+    @patch("requests.Session.get")
+    def test_prefetch_records(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"files": [{"key": "data.zip"}]}
+        mock_response.status_code = 200
+        mock_get.return_value = mock_response
+        self.addCleanup(ZenodoDataStore._prefetched_files.clear)
+        ZenodoDataStore.prefetch_records("1000001", "1000002")
+        self.assertEqual(2, mock_get.call_count)
+
+        store = new_data_store(DATA_STORE_ID, root="1000001", use_cache=False)
+        self.assertEqual(["data.zip"], list(store.get_data_ids()))
+        self.assertEqual(2, mock_get.call_count)
+
+    def test_cache_store_params_not_modified(self):
+        cache_store_params = dict(root="zenodo_cache/custom")
+        store = new_data_store(
+            DATA_STORE_ID, root=self.record_id, cache_store_params=cache_store_params
+        )
+        self.assertEqual(dict(root="zenodo_cache/custom"), cache_store_params)
+        self.assertEqual(10, store._cache_store_params["max_depth"])
+
+    @patch("xcube_zenodo._utils.requests_cache")
+    def test_session(self, mock_requests_cache):
+        store = new_data_store(DATA_STORE_ID, root=self.record_id)
+        # the cached session is only created on first use
+        mock_requests_cache.CachedSession.assert_not_called()
+        self.assertIs(mock_requests_cache.CachedSession.return_value, store._session)
+
+        store = new_data_store(DATA_STORE_ID, root=self.record_id, use_cache=False)
+        self.assertIs(requests.Session, type(store._session))
+
+    @patch("time.monotonic")
+    def test_prefetch_records_prunes_expired(self, mock_monotonic):
+        self.addCleanup(ZenodoDataStore._prefetched_files.clear)
+        ZenodoDataStore._prefetched_files.update(
+            {"1000001": (0.0, []), "1000002": (100.0, [])}
+        )
+        mock_monotonic.return_value = 120.0
+        new_data_store(DATA_STORE_ID, root="1000003", use_cache=False)
+        self.assertEqual(["1000002"], list(ZenodoDataStore._prefetched_files))
+
     @patch("xcube.core.store.fs.store.BaseFsDataStore.has_data")
     def test_has_data(self, mock_has_data):
         mock_has_data.return_value = True
@@ -142,6 +219,17 @@ class ZenodoDataStoreTest(unittest.TestCase):
         self.assertDictEqual(expected_descriptor, descriptor.to_dict())
         mock_describe_data.assert_called_once_with(data_id="test.tif", data_type=None)
 
+    @patch("xcube.core.store.fs.store.BaseFsDataStore.describe_data")
+    def test_describe_data_many(self, mock_describe_data):
+        mock_describe_data.side_effect = lambda data_id, data_type: (
+            DatasetDescriptor(data_id=data_id)
+        )
+        store = new_data_store(DATA_STORE_ID, root=self.record_id)
+        descriptors = store.describe_data_many(["test.tif", "test.zarr"])
+        self.assertEqual(["test.tif", "test.zarr"], [d.data_id for d in descriptors])
+        self.assertEqual(2, mock_describe_data.call_count)
+        self.assertEqual([], store.describe_data_many([]))
+
     def test_get_data_opener_ids(self):
         store = new_data_store(DATA_STORE_ID, root=self.record_id)
         self.assertCountEqual(
@@ -218,6 +306,15 @@ class ZenodoDataStoreTest(unittest.TestCase):
             f"{cm.exception}",
         )
 
+    @patch("fsspec.get_mapper")
+    def test_open_data_netcdf_not_preloaded(self, mock_get_mapper):
+        store = new_data_store(DATA_STORE_ID, root=self.record_id)
+
+        with self.assertRaises(DataStoreError) as cm:
+            _ = store.open_data(data_id="test.nc")
+        self.assertIn("store.preload_data('test.nc') first.", f"{cm.exception}")
+        mock_get_mapper.assert_not_called()
+
     def test_preload_data_tar_gz(self):
         store = new_data_store(DATA_STORE_ID, root="6453099")
         cache_store = store.preload_data(silent=True)
@@ -363,23 +460,12 @@ class ZenodoDataStoreTest(unittest.TestCase):
     @patch("fsspec.get_mapper")
     @patch("xarray.open_dataset")
     def test_open_compressed_zarr(self, mock_open_dataset, mock_get_mapper):
+        url = "https://zenodo.org/records/13333034/files"
         test_cases = [
-            (
-                "data.zarr.zip",
-                "zip::https://zenodo.org/records/13333034/files/data.zarr.zip",
-            ),
-            (
-                "data.zip",
-                "zip::https://zenodo.org/records/13333034/files/data.zip",
-            ),
-            (
-                "data.zarr.tar",
-                "tar::https://zenodo.org/records/13333034/files/data.zarr.tar",
-            ),
-            (
-                "data.zarr.tar.gz",
-                "tar::https://zenodo.org/records/13333034/files/data.zarr.tar.gz",
-            ),
+            ("data.zarr.zip", f"zip::blockcache::{url}/data.zarr.zip"),
+            ("data.zip", f"zip::blockcache::{url}/data.zip"),
+            ("data.zarr.tar", f"tar::blockcache::{url}/data.zarr.tar"),
+            ("data.zarr.tar.gz", f"tar::{url}/data.zarr.tar.gz"),
         ]
 
         for data_id, expected_protocol in test_cases:
@@ -395,6 +481,11 @@ class ZenodoDataStoreTest(unittest.TestCase):
                 mock_get_mapper.assert_called_once()
                 args, kwargs = mock_get_mapper.call_args
                 self.assertEqual(args[0], expected_protocol)
+                if "blockcache" in expected_protocol:
+                    self.assertEqual(
+                        "zenodo_cache/13333034/.blockcache",
+                        kwargs["blockcache"]["cache_storage"],
+                    )
 
                 mock_open_dataset.assert_called_once()
                 args, kwargs = mock_open_dataset.call_args
@@ -408,6 +499,40 @@ class ZenodoDataStoreTest(unittest.TestCase):
                 mock_get_mapper.reset_mock()
                 mock_open_dataset.reset_mock()
 
+    @patch("fsspec.get_mapper")
+    @patch("xarray.open_dataset")
+    def test_open_compressed_zarr_without_block_cache(
+        self, mock_open_dataset, mock_get_mapper
+    ):
+        store = new_data_store(DATA_STORE_ID, root="13333034", use_block_cache=False)
+        store._open_compressed_zarr("data.zip")
+        mock_get_mapper.assert_called_once_with(
+            "zip::https://zenodo.org/records/13333034/files/data.zip"
+        )
+
+    @patch("fsspec.get_mapper")
+    @patch("xarray.open_dataset")
+    def test_open_compressed_zarr_consolidated(
+        self, mock_open_dataset, mock_get_mapper
+    ):
+        mock_mapper = MagicMock(name="mapper")
+        mock_mapper.__contains__.side_effect = lambda key: (
+            key == "data.zarr/.zmetadata"
+        )
+        mock_get_mapper.return_value = mock_mapper
+        store = new_data_store(DATA_STORE_ID, root="13333034")
+
+        store._open_compressed_zarr("data.zip")
+        _, kwargs = mock_open_dataset.call_args
+        self.assertTrue(kwargs["consolidated"])
+        self.assertEqual("data.zarr", kwargs["group"])
+
+        # the result of the probe is reused when reopening the dataset
+        store._open_compressed_zarr("data.zip")
+        _, kwargs = mock_open_dataset.call_args
+        self.assertTrue(kwargs["consolidated"])
+        self.assertEqual(1, mock_mapper.__contains__.call_count)
+
     def test_open_compressed_zarr_raises_for_rar(self):
         with pytest.raises(
             ValueError, match=f"Dataset in 'rar' format cannot be opened lazily."
@@ -19,17 +19,59 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import functools
+import os
 from typing import Optional
 
-from .constants import PRELOAD_FORMATS
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    # optional, caches the responses of the Zenodo API on disk
+    import requests_cache
+except ImportError:
+    requests_cache = None
 
+from .constants import HTTP_CACHE_EXPIRE_AFTER, HTTP_CACHE_PATH, PRELOAD_FORMATS
+
+_PRELOAD_FORMATS = frozenset(PRELOAD_FORMATS)
+
+
+@functools.lru_cache(maxsize=1024)
 def identify_preload_file_format(data_id: str) -> Optional[str]:
-    for format_id in PRELOAD_FORMATS:
-        if data_id.endswith(format_id):
-            return format_id
-    return None
+    if data_id.endswith(".tar.gz"):
+        return "tar.gz"
+    _, dot, ext = data_id.rpartition(".")
+    return ext if dot and ext in _PRELOAD_FORMATS else None
 
 
 def is_supported_preload_file_format(data_id: str) -> bool:
     return identify_preload_file_format(data_id) is not None
+
+
+def new_http_session(use_cache: bool = False) -> requests.Session:
+    """Creates a session which keeps connections to Zenodo alive, so that
+    subsequent requests do not pay the TCP and TLS handshakes again.
+    If *use_cache* is True and the optional package ``requests-cache`` is
+    installed, responses are cached on disk for a limited time.
+    """
+    if use_cache and requests_cache is not None:
+        session = requests_cache.CachedSession(
+            os.path.expanduser(HTTP_CACHE_PATH),
+            backend="sqlite",
+            expire_after=HTTP_CACHE_EXPIRE_AFTER,
+        )
+    else:
+        session = requests.Session()
+    # retry transient server errors; the last response is returned if all
+    # retries fail, so that the callers can report its status
+    retry = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=[500, 502, 503, 504],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
@@ -24,6 +24,9 @@ import logging
 DATA_STORE_ID = "zenodo"
 LOG = logging.getLogger("xcube.zenodo")
 CACHE_FOLDER_NAME = "zenodo_cache"
+BLOCK_CACHE_FOLDER_NAME = ".blockcache"
+HTTP_CACHE_PATH = "~/.cache/xcube_zenodo/http"
+HTTP_CACHE_EXPIRE_AFTER = 3600  # seconds
 
 # preload specific constants
 PRELOAD_FORMATS = ["nc", "zip", "tar", "tar.gz", "rar"]
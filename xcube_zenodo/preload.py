@@ -19,10 +19,21 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import io
+import json
+import os
+import queue
+import shutil
 import tarfile
+import tempfile
+import threading
+import time
+import uuid
 import zipfile
-from collections.abc import Sequence
-from concurrent.futures.thread import ThreadPoolExecutor
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from contextlib import ExitStack, contextmanager
+from typing import IO
 
 import fsspec
 import rarfile
@@ -31,7 +42,18 @@ from xcube.core.chunk import chunk_dataset
 from xcube.core.store import DataStoreError, PreloadedDataStore, new_data_store
 from xcube.core.store.preload import ExecutorPreloadHandle, PreloadState, PreloadStatus
 
-from ._utils import identify_preload_file_format
+try:
+    # optional, ISA-L decompresses gzip streams considerably faster than zlib
+    from isal import igzip
+except ImportError:
+    igzip = None
+try:
+    # optional, decompresses gzip files in parallel using all CPU cores
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+from ._utils import identify_preload_file_format, new_http_session
 from .constants import (
     LOG,
     MAP_FILE_EXTENSION_FORMAT,
@@ -43,6 +65,24 @@ from .constants import (
 )
 
 _CHUNK_SIZE = 1024 * 1024
+_DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+_WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+_MANIFEST_FILENAME = ".manifest.json"
+# archive formats which are extracted while being downloaded; with rapidgzip,
+# tar.gz archives are downloaded first, as parallel decompression needs seeking
+_STREAMED_FORMATS = (
+    ("zip", "tar") if rapidgzip is not None else ("zip", "tar", "tar.gz")
+)
+# archive formats which allow to access their members in arbitrary order
+_RANDOM_ACCESS_FORMATS = ("zip", "rar")
+# maximum number of files which are copied or reformatted concurrently
+_MAX_PREPARE_WORKERS = 8
+# shared by all preload workers to reuse the connections to Zenodo
+_SESSION = new_http_session()
+# deletes the temporary files of previous preloads in the background
+_CLEANUP_EXECUTOR = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="xcube-zenodo-cleanup"
+)
 
 
 class ZenodoPreloadHandle(ExecutorPreloadHandle):
@@ -59,38 +99,68 @@ class ZenodoPreloadHandle(ExecutorPreloadHandle):
         # setup processing store
         # noinspection PyProtectedMember
         self._process_store = new_data_store(
-            "file", root=f"{TEMP_PROCESSING_FOLDER}/{self._cache_store._raw_root}"
+            "file",
+            root=f"{TEMP_PROCESSING_FOLDER}/{self._cache_store._raw_root}",
+            max_depth=10,
         )
         self._process_fs: fsspec.AbstractFileSystem = self._process_store.fs
         self._process_root = self._process_store.root
+
+        # the manifest keeps track of the preload stage of each data ID, so that
+        # an interrupted preload can be resumed by a subsequent request
+        self._manifest_path = self._process_fs.sep.join(
+            [self._process_root, _MANIFEST_FILENAME]
+        )
+        self._manifest_lock = threading.Lock()
+        self._cleanup_futures: list[Future] = []
         self._clean_up()
         if not self._process_fs.isdir(self._process_root):
             self._process_fs.makedirs(self._process_root)
 
-        # limit number of workers in the preload process
+        # the data IDs are preloaded concurrently by the executor of the parent
+        # class; limit the number of workers to respect the rate limits of Zenodo
+        max_workers = preload_params.pop("max_workers", 4)
         if "executor" not in preload_params:
-            max_workers = preload_params.pop("max_workers", 4)
-            preload_params["executor"] = ThreadPoolExecutor(max_workers=max_workers)
+            preload_params["executor"] = ThreadPoolExecutor(
+                max_workers=max(1, min(max_workers, len(data_ids))),
+                thread_name_prefix="xcube-zenodo-preload",
+            )
+
+        # the preloads of this handle only add their own data IDs to the cache,
+        # so its content is indexed once up front instead of once per data ID;
+        # a preloaded data ID starts with the name of its source file, with or
+        # without the file extension
+        self._cached_names = set()
+        for cached_data_id in self._cache_store.get_data_ids():
+            name = cached_data_id.split("/", maxsplit=1)[0]
+            self._cached_names.add(name)
+            self._cached_names.add(name.rsplit(".", maxsplit=1)[0])
 
         # trigger preload in parent class
         self._data_ids = {data_id.split("/")[-1]: data_id for data_id in data_ids}
         super().__init__(data_ids=tuple(self._data_ids.keys()), **preload_params)
 
-        # delete temp storage
+        # delete temp storage of completed preloads
         self._clean_up()
 
     def close(self) -> None:
-        self._clean_up()
+        self._clean_up(completed_only=False)
+        wait(self._cleanup_futures)
         if self._cache_fs.isdir(self._cache_root):
             self._cache_fs.rm(self._cache_root, recursive=True)
 
     def preload_data(self, data_id: str, **preload_params):
         format_ext = identify_preload_file_format(data_id)
         force_preload = preload_params.get("force_preload", False)
-        data_id_mod = data_id.replace(f".{format_ext}", "")
+        data_id_mod = data_id.removesuffix(f".{format_ext}")
+        # a preload which was interrupted while writing into the cache leaves
+        # partial data there, so only a completed preload counts as preloaded
+        entry = self._read_manifest().get(data_id, {})
+        stage = entry.get("stage")
         if (
-            any(data_id_mod in ext_id for ext_id in self._cache_store.get_data_ids())
-            and not force_preload
+            not force_preload
+            and stage in (None, "done")
+            and data_id_mod in self._cached_names
         ):
             self.notify(
                 PreloadState(
@@ -99,43 +169,189 @@ class ZenodoPreloadHandle(ExecutorPreloadHandle):
                 )
             )
         else:
-            self._download_data(data_id)
-            if format_ext != "nc":
-                self._decompress_data(data_id)
-            self._prepare_data(data_id, **preload_params)
-
-    def _download_data(self, data_id: str):
-        with requests.get(self._data_ids[data_id], stream=True) as response:
-            _check_requests_response(response)
-            total_size = int(response.headers.get("content-length", 0))
+            target_format = preload_params.get("target_format")
+            if target_format is None and preload_params.get("chunks") is not None:
+                LOG.warning(
+                    "Chunks can be only considered in combination with "
+                    "`target_format`. No manipulation is performed to the "
+                    "extracted data."
+                )
 
-        # start downloading
+            # skip the stages which have been completed by an interrupted preload;
+            # a failed preload is started from scratch
+            if stage not in ("decompress", "prepare"):
+                if format_ext in _STREAMED_FORMATS:
+                    stage = self._fetch_and_extract(data_id, target_format)
+                else:
+                    etag = entry.get("etag") if stage != "failed" else None
+                    self._download_data(data_id, etag=etag)
+                    stage = "prepare" if format_ext == "nc" else "decompress"
+                self._update_manifest(data_id, stage=stage)
+            try:
+                if stage == "decompress":
+                    into_cache = (
+                        target_format is None and format_ext in _RANDOM_ACCESS_FORMATS
+                    )
+                    self._decompress_data(data_id, into_cache=into_cache)
+                    stage = "done" if into_cache else "prepare"
+                    self._update_manifest(data_id, stage=stage)
+                if stage == "prepare":
+                    self._prepare_data(data_id, **preload_params)
+            except Exception:
+                # a broken archive must not be resumed, but the entry is kept, so
+                # that the partial data in the cache is not taken as preloaded
+                self._update_manifest(data_id, stage="failed")
+                raise
+            self._update_manifest(data_id, stage="done")
+
+    def _download_data(self, data_id: str, etag: str = None):
+        # resume a partial download of an earlier preload; due to the If-Range
+        # header, the server sends the whole file if it has changed since then
+        download_path = self._process_fs.sep.join([self._process_root, data_id])
         download_size = 0
-        self.notify(
-            PreloadState(
+        headers = {}
+        if etag is not None and self._process_fs.isfile(download_path):
+            download_size = self._process_fs.size(download_path)
+            headers = {"Range": f"bytes={download_size}-", "If-Range": etag}
+
+        with _SESSION.get(
+            self._data_ids[data_id], stream=True, headers=headers
+        ) as response:
+            if response.status_code == 416:
+                # range not satisfiable, the file has been downloaded completely
+                return
+            _check_requests_response(response)
+            if response.status_code != 206:
+                download_size = 0
+            total_size = download_size + int(response.headers.get("content-length", 0))
+            self._update_manifest(
                 data_id,
-                status=PreloadStatus.started,
-                progress=0.0,
-                message="Download in progress",
+                stage="download",
+                etag=response.headers.get("etag"),
+                downloaded=download_size,
             )
-        )
-        with requests.get(self._data_ids[data_id], stream=True) as response:
-            _check_requests_response(response)
-            download_path = self._process_fs.sep.join([self._process_root, data_id])
-            with self._process_fs.open(download_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
-                    file.write(chunk)
-                    download_size += len(chunk)
+
+            # start downloading
+            self.notify(
+                PreloadState(
+                    data_id,
+                    status=PreloadStatus.started,
+                    progress=(
+                        PRELOAD_DOWNLOAD_FRACTION * download_size / total_size
+                        if total_size
+                        else 0.0
+                    ),
+                    message="Download in progress",
+                )
+            )
+            # a large buffer reduces the number of write syscalls per chunk
+            file = open(
+                download_path,
+                "ab" if download_size else "wb",
+                buffering=_WRITE_BUFFER_SIZE,
+            )
+            # read the raw stream in large blocks, which avoids the per-chunk
+            # overhead of iter_content
+            response.raw.decode_content = True
+            resumed_size = download_size
+            throttle = _ProgressThrottle()
+
+            def notify_progress(size: int):
+                nonlocal download_size
+                download_size = resumed_size + size
+                if total_size and throttle.is_due(download_size / total_size):
                     self.notify(
                         PreloadState(
                             data_id,
                             progress=PRELOAD_DOWNLOAD_FRACTION
-                            * download_size
-                            / total_size,
+                            * min(download_size / total_size, 1.0),
                         )
                     )
 
-    def _decompress_data(self, data_id: str):
+            try:
+                with file:
+                    shutil.copyfileobj(
+                        _ProgressReader(response.raw, notify_progress),
+                        file,
+                        _DOWNLOAD_CHUNK_SIZE,
+                    )
+                self.notify(PreloadState(data_id, progress=PRELOAD_DOWNLOAD_FRACTION))
+            finally:
+                self._update_manifest(data_id, downloaded=download_size)
+
+    def _fetch_and_extract(self, data_id: str, target_format: str | None) -> str:
+        """Downloads a zip or tar archive and extracts it without storing the
+        archive in the processing folder first. tar archives are extracted
+        while the bytes arrive; zip archives need random access and are spooled
+        into an anonymous temporary file. Returns the next stage.
+        """
+        self._update_manifest(data_id, stage="download")
+        format_ext = identify_preload_file_format(data_id)
+        with ExitStack() as stack:
+            response = stack.enter_context(
+                _SESSION.get(self._data_ids[data_id], stream=True)
+            )
+            _check_requests_response(response)
+            total_size = int(response.headers.get("content-length", 0))
+            self.notify(
+                PreloadState(
+                    data_id,
+                    status=PreloadStatus.started,
+                    progress=0.0,
+                    message="Download in progress",
+                )
+            )
+            response.raw.decode_content = True
+            if format_ext == "zip":
+                fraction = PRELOAD_DOWNLOAD_FRACTION
+            else:
+                fraction = PRELOAD_DOWNLOAD_FRACTION + PRELOAD_DECOMPRESSION_FRACTION
+
+            throttle = _ProgressThrottle()
+
+            def notify_progress(size: int):
+                if total_size and throttle.is_due(size / total_size):
+                    progress = fraction * min(size / total_size, 1.0)
+                    self.notify(PreloadState(data_id, progress=progress))
+
+            reader = _ProgressReader(response.raw, notify_progress)
+            if format_ext != "zip":
+                # download the next chunks while the current ones are decompressed
+                reader = stack.enter_context(_read_ahead(reader))
+                mode = "r|" if format_ext == "tar" else "r|gz"
+                if format_ext == "tar.gz" and igzip is not None:
+                    reader = stack.enter_context(igzip.IGzipFile(fileobj=reader))
+                    mode = "r|"
+                with tarfile.open(fileobj=reader, mode=mode) as tar_ref:
+                    dirname = data_id.removesuffix(f".{format_ext}")
+                    extract_dir = self._process_fs.sep.join(
+                        [self._process_root, dirname]
+                    )
+                    tar_ref.extractall(path=extract_dir, filter=tarfile.data_filter)
+                return "prepare"
+
+            # zipfile needs a real file, SpooledTemporaryFile lacks seekable() on 3.10
+            spool = stack.enter_context(tempfile.TemporaryFile(dir=self._process_root))
+            shutil.copyfileobj(reader, spool, _CHUNK_SIZE)
+            response.close()
+            spool.seek(0)
+            self._notify_decompression(data_id)
+            if target_format is None:
+                self._extract_into_cache(data_id, spool)
+                return "done"
+            self._extract_archive(data_id, spool)
+            return "prepare"
+
+    def _decompress_data(self, data_id: str, into_cache: bool = False):
+        self._notify_decompression(data_id)
+        file_path = self._process_fs.sep.join([self._process_root, data_id])
+        if into_cache:
+            self._extract_into_cache(data_id, file_path)
+        else:
+            self._extract_archive(data_id, file_path)
+        self._process_fs.delete(file_path)
+
+    def _notify_decompression(self, data_id: str):
         self.notify(
             PreloadState(
                 data_id,
@@ -143,35 +359,100 @@ class ZenodoPreloadHandle(ExecutorPreloadHandle):
                 message="Decompression in progress",
             )
         )
-        file_path = self._process_fs.sep.join([self._process_root, data_id])
-        with self._process_fs.open(file_path, "rb") as file:
 
-            # compressed file is a zip
-            if file_path.endswith(".zip"):
-                with zipfile.ZipFile(file, "r") as zip_ref:
-                    dirname = data_id.replace(".zip", "")
-                    extract_dir = self._process_fs.sep.join(
-                        [self._process_root, dirname]
-                    )
-                    zip_ref.extractall(extract_dir)
-
-            # compressed file is a tar or tar.gz
-            elif file_path.endswith(".tar") or file_path.endswith(".tar.gz"):
-                format_ext = identify_preload_file_format(file_path)
-                mode = "r" if format_ext == "tar" else "r:gz"
-                with tarfile.open(fileobj=file, mode=mode) as tar_ref:
-                    dirname = data_id.replace(f".{format_ext}", "")
-                    extract_dir = self._process_fs.sep.join(
-                        [self._process_root, dirname]
+    def _extract_archive(self, data_id: str, file: str | IO[bytes]) -> None:
+        # compressed file is a zip
+        if data_id.endswith(".zip"):
+            with zipfile.ZipFile(file, "r") as zip_ref:
+                dirname = data_id.removesuffix(".zip")
+                extract_dir = self._process_fs.sep.join([self._process_root, dirname])
+                zip_ref.extractall(extract_dir)
+
+        # compressed file is a tar or tar.gz; these are usually extracted while
+        # being downloaded, except for tar.gz if rapidgzip is used, but an
+        # interrupted preload may have left the downloaded archive
+        elif data_id.endswith((".tar", ".tar.gz")):
+            format_ext = identify_preload_file_format(data_id)
+            dirname = data_id.removesuffix(f".{format_ext}")
+            extract_dir = self._process_fs.sep.join([self._process_root, dirname])
+            with ExitStack() as stack:
+                if format_ext == "tar.gz" and rapidgzip is not None:
+                    gz_ref = stack.enter_context(
+                        rapidgzip.open(file, parallelization=os.cpu_count())
                     )
-                    tar_ref.extractall(path=extract_dir, filter="data")
+                    tar_ref = tarfile.open(fileobj=gz_ref, mode="r|")
+                elif isinstance(file, str):
+                    tar_ref = tarfile.open(file, mode="r:*")
+                else:
+                    tar_ref = tarfile.open(fileobj=file, mode="r:*")
+                with tar_ref:
+                    tar_ref.extractall(path=extract_dir, filter=tarfile.data_filter)
 
-            # compressed file is a rar
-            elif file_path.endswith(".rar"):
-                with rarfile.RarFile(file, "r") as rar_ref:
-                    rar_ref.extractall(self._process_root)
+        # compressed file is a rar
+        elif data_id.endswith(".rar"):
+            with rarfile.RarFile(file, "r") as rar_ref:
+                rar_ref.extractall(self._process_root)
 
-        self._process_fs.delete(file_path)
+        else:
+            raise DataStoreError(f"Cannot extract {data_id}, unsupported archive.")
+
+    def _extract_into_cache(self, data_id: str, file: str | IO[bytes]) -> None:
+        """Extracts the datasets of a zip or rar archive directly into the
+        cache store, skipping the intermediate extraction to the processing
+        folder. Used if the datasets are kept in their native format.
+        """
+        format_ext = identify_preload_file_format(data_id)
+        dirname = data_id.removesuffix(f".{format_ext}")
+        with ExitStack() as stack:
+            if format_ext == "zip":
+                archive = stack.enter_context(zipfile.ZipFile(file, "r"))
+                prefix = ""
+            else:
+                # rar archives are expected to contain the top-level folder
+                archive = stack.enter_context(rarfile.RarFile(file, "r"))
+                prefix = f"{dirname}/"
+
+            member_sizes = {
+                info.filename[len(prefix) :]: info.file_size
+                for info in archive.infolist()
+                if not info.is_dir() and info.filename.startswith(prefix)
+            }
+            entries = group_archive_members(member_sizes)
+            total_size = sum(member_sizes.values())
+            size_count = 0
+            created_dirs = set()
+            for entry, members in entries.items():
+                source_data_id = f"{dirname}/{entry}"
+                if source_data_id.split(".")[-1] in MAP_FILE_EXTENSION_FORMAT:
+                    target_data_id = source_data_id
+                    if len(entries) == 1:
+                        target_data_id = self._define_single_data_id(target_data_id)
+                    target_fp = (
+                        f"{self._cache_root}{self._cache_fs.sep}{target_data_id}"
+                    )
+                    for member in members:
+                        dst_file = target_fp + member[len(entry) :]
+                        dst_dir = dst_file.rsplit(self._cache_fs.sep, maxsplit=1)[0]
+                        if dst_dir not in created_dirs:
+                            self._cache_fs.makedirs(dst_dir, exist_ok=True)
+                            created_dirs.add(dst_dir)
+                        with archive.open(f"{prefix}{member}") as src_f:
+                            with self._cache_fs.open(dst_file, "wb") as dst_f:
+                                shutil.copyfileobj(src_f, dst_f, _CHUNK_SIZE)
+                size_count += sum(member_sizes[member] for member in members)
+                if total_size:
+                    self.notify(
+                        PreloadState(
+                            data_id,
+                            progress=PRELOAD_DOWNLOAD_FRACTION
+                            + (size_count / total_size)
+                            * (
+                                PRELOAD_DECOMPRESSION_FRACTION
+                                + PRELOAD_PROCESSING_FRACTION
+                            ),
+                        )
+                    )
+        self.notify(PreloadState(data_id, progress=1.0, message="Preload finished"))
 
     def _prepare_data(self, data_id: str, **preload_params):
         self.notify(
@@ -183,45 +464,69 @@ class ZenodoPreloadHandle(ExecutorPreloadHandle):
         )
         format_ext = identify_preload_file_format(data_id)
         if format_ext == "nc":
-            extract_dir = self._process_root
+            file_path = self._process_fs.sep.join([self._process_root, data_id])
+            listing = [self._process_fs.info(file_path)]
         else:
-            dirname = data_id.replace(f".{format_ext}", "")
+            dirname = data_id.removesuffix(f".{format_ext}")
             extract_dir = self._process_fs.sep.join([self._process_root, dirname])
-        sub_files = recursive_listdir(self._process_fs, extract_dir)
-        total_size = sum([sub_file["size"] for sub_file in sub_files])
+            listing = recursive_listdir(self._process_fs, extract_dir)
+        prefix = f"{self._process_root}{self._process_fs.sep}"
+        source_data_ids = [
+            sub_file["name"].removeprefix(prefix) for sub_file in listing
+        ]
+        sizes = [sub_file["size"] for sub_file in listing]
+        is_dirs = [sub_file["type"] == "directory" for sub_file in listing]
+        num_files = len(listing)
+        total_size = sum(sizes)
+        known_data_ids = set(self._process_store.get_data_ids())
         size_count = 0
         target_format = preload_params.get("target_format")
         chunks = preload_params.get("chunks")
-        if target_format is None and chunks is not None:
-            LOG.warning(
-                "Chunks can be only considered in combination with `target_format`. "
-                "No manipulation is performed to the extracted data."
-            )
-        for sub_file in sub_files:
-            source_data_id = sub_file["name"].replace(
-                f"{self._process_root}{self._process_fs.sep}", ""
-            )
-            if self._process_store.has_data(source_data_id):
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(_MAX_PREPARE_WORKERS, num_files))
+        ) as executor:
+            futures = {}
+            for source_data_id, size, is_dir in zip(source_data_ids, sizes, is_dirs):
+                if source_data_id not in known_data_ids:
+                    size_count += size
+                    continue
                 format_ext = MAP_FILE_EXTENSION_FORMAT[source_data_id.split(".")[-1]]
                 if target_format is None or target_format == format_ext:
-                    self._copy_file(source_data_id, len(sub_files))
+                    future = executor.submit(
+                        self._copy_file,
+                        source_data_id,
+                        num_files,
+                        is_dir=is_dir,
+                    )
                 else:
-                    self._reformat_dataset(
-                        source_data_id, target_format, chunks, len(sub_files)
+                    future = executor.submit(
+                        self._reformat_dataset,
+                        source_data_id,
+                        target_format,
+                        chunks,
+                        num_files,
                     )
-
-            size_count += sub_file["size"]
-            self.notify(
-                PreloadState(
-                    data_id,
-                    progress=PRELOAD_DOWNLOAD_FRACTION
-                    + PRELOAD_DECOMPRESSION_FRACTION
-                    + (size_count / total_size) * PRELOAD_PROCESSING_FRACTION,
-                )
-            )
+                futures[future] = size
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    size_count += futures[future]
+                    processed = size_count / total_size if total_size else 1.0
+                    self.notify(
+                        PreloadState(
+                            data_id,
+                            progress=PRELOAD_DOWNLOAD_FRACTION
+                            + PRELOAD_DECOMPRESSION_FRACTION
+                            + processed * PRELOAD_PROCESSING_FRACTION,
+                        )
+                    )
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
         self.notify(PreloadState(data_id, progress=1.0, message="Preload finished"))
 
-    def _copy_file(self, source_data_id: str, len_files: int) -> None:
+    def _copy_file(self, source_data_id: str, len_files: int, is_dir: bool) -> None:
         target_data_id = source_data_id
         if len_files == 1:
             target_data_id = self._define_single_data_id(target_data_id)
@@ -229,41 +534,38 @@ class ZenodoPreloadHandle(ExecutorPreloadHandle):
         source_fp = f"{self._process_root}{self._process_fs.sep}{source_data_id}"
         target_fp = f"{self._cache_root}{self._cache_fs.sep}{target_data_id}"
         dirname = self._cache_fs.sep.join(target_fp.split(self._cache_fs.sep)[:-1])
-        if not self._cache_fs.isdir(dirname):
-            self._cache_fs.makedirs(dirname)
-        if self._process_fs.isdir(source_fp):
+        self._cache_fs.makedirs(dirname, exist_ok=True)
+        if is_dir:
             # --- Case: Zarr or directory ---
             # Recursively copy directory contents
+            source_files = []
+            target_files = []
             for path, dirs, files in self._process_fs.walk(source_fp):
-                rel_path = path.replace(source_fp, "").lstrip(self._process_fs.sep)
+                rel_path = path.removeprefix(source_fp).lstrip(self._process_fs.sep)
                 target_dir = (
                     f"{target_fp}{self._cache_fs.sep}{rel_path}"
                     if rel_path
                     else target_fp
                 )
-                if not self._cache_fs.exists(target_dir):
-                    self._cache_fs.makedirs(target_dir, exist_ok=True)
+                self._cache_fs.makedirs(target_dir, exist_ok=True)
 
                 for file in files:
-                    src_file = f"{path}{self._process_fs.sep}{file}"
-                    dst_file = f"{target_dir}{self._cache_fs.sep}{file}"
-
-                    with self._process_fs.open(src_file, "rb") as src_f:
-                        with self._cache_fs.open(dst_file, "wb") as dst_f:
-                            while True:
-                                chunk = src_f.read(_CHUNK_SIZE)
-                                if not chunk:
-                                    break
-                                dst_f.write(chunk)
+                    source_files.append(f"{path}{self._process_fs.sep}{file}")
+                    target_files.append(f"{target_dir}{self._cache_fs.sep}{file}")
+            self._transfer_files(source_files, target_files)
         else:
             # --- Case: Regular single file ---
-            with self._process_fs.open(source_fp, "rb") as src_file:
-                with self._cache_fs.open(target_fp, "wb") as dst_file:
-                    while True:
-                        chunk = src_file.read(_CHUNK_SIZE)
-                        if not chunk:
-                            break
-                        dst_file.write(chunk)
+            self._transfer_files([source_fp], [target_fp])
+
+    def _transfer_files(self, source_fps: list[str], target_fps: list[str]) -> None:
+        if self._process_fs.protocol == self._cache_fs.protocol:
+            # native copy, e.g. sendfile(2) on the local filesystem
+            for source_fp, target_fp in zip(source_fps, target_fps):
+                self._process_fs.cp_file(source_fp, target_fp)
+        else:
+            # the processing folder is local, so upload in one batch, which
+            # remote filesystems such as s3fs transfer concurrently
+            self._cache_fs.put(source_fps, target_fps)
 
     def _reformat_dataset(
         self, source_data_id: str, target_format: str, chunks: Sequence, len_files: int
@@ -273,7 +575,7 @@ class ZenodoPreloadHandle(ExecutorPreloadHandle):
             target_format = "zarr"
         target_ext = MAP_FORMAT_FILE_EXTENSION[target_format]
         format_ext = source_data_id.split(".")[-1]
-        target_data_id = source_data_id.replace(format_ext, target_ext)
+        target_data_id = source_data_id[: -len(format_ext)] + target_ext
         if len_files == 1:
             target_data_id = self._define_single_data_id(target_data_id)
         # noinspection PyUnresolvedReferences
@@ -307,9 +609,192 @@ class ZenodoPreloadHandle(ExecutorPreloadHandle):
         else:
             return f"{dirname}.{file_ext}"
 
-    def _clean_up(self) -> None:
-        if self._process_fs.isdir(self._process_root):
-            self._process_fs.rm(self._process_root, recursive=True)
+    def _read_manifest(self) -> dict:
+        if not self._process_fs.isfile(self._manifest_path):
+            return {}
+        try:
+            with self._process_fs.open(self._manifest_path, "r") as file:
+                return json.load(file)
+        except json.JSONDecodeError:
+            LOG.warning("Preload manifest is corrupted and will be ignored.")
+            return {}
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self._process_fs.makedirs(self._process_root, exist_ok=True)
+        tmp_path = f"{self._manifest_path}.tmp"
+        with self._process_fs.open(tmp_path, "w") as file:
+            json.dump(manifest, file)
+        self._process_fs.mv(tmp_path, self._manifest_path)
+
+    def _update_manifest(self, data_id: str, **entry) -> None:
+        with self._manifest_lock:
+            manifest = self._read_manifest()
+            manifest[data_id] = {**manifest.get(data_id, {}), **entry}
+            self._write_manifest(manifest)
+
+    def _clean_up(self, completed_only: bool = True) -> None:
+        # the trash of earlier preloads remains if their process was killed
+        # before deleting it
+        for trash_dir in self._process_fs.glob(f"{self._process_root}.*.trash"):
+            self._delete_trash(trash_dir)
+        if not self._process_fs.isdir(self._process_root):
+            return
+        with self._manifest_lock:
+            manifest = self._read_manifest()
+            pending = {
+                data_id: entry
+                for data_id, entry in manifest.items()
+                if entry.get("stage") != "done"
+            }
+            # the files are moved aside, which is a cheap rename, and deleted
+            # in the background, so that the preload does not wait for it
+            trash_dir = f"{self._process_root}.{uuid.uuid4().hex}.trash"
+            if not completed_only or not pending:
+                self._process_fs.mv(self._process_root, trash_dir, recursive=True)
+            else:
+                # keep the downloaded and extracted files of unfinished preloads,
+                # but not those of failed ones
+                keep = {_MANIFEST_FILENAME}
+                for data_id, entry in pending.items():
+                    if entry.get("stage") == "failed":
+                        continue
+                    format_ext = identify_preload_file_format(data_id)
+                    keep.add(data_id)
+                    keep.add(data_id.removesuffix(f".{format_ext}"))
+                paths = [
+                    path
+                    for path in self._process_fs.ls(self._process_root, detail=False)
+                    if path.split(self._process_fs.sep)[-1] not in keep
+                ]
+                self._write_manifest(pending)
+                if not paths:
+                    return
+                self._process_fs.makedirs(trash_dir)
+                for path in paths:
+                    name = path.split(self._process_fs.sep)[-1]
+                    self._process_fs.mv(
+                        path,
+                        self._process_fs.sep.join([trash_dir, name]),
+                        recursive=True,
+                    )
+        self._delete_trash(trash_dir)
+
+    def _delete_trash(self, trash_dir: str) -> None:
+        self._cleanup_futures.append(
+            _CLEANUP_EXECUTOR.submit(shutil.rmtree, trash_dir, ignore_errors=True)
+        )
+
+
+class _ProgressReader(io.RawIOBase):
+    """Read-only stream wrapper, which reports the accumulated number
+    of bytes read to *callback*.
+    """
+
+    def __init__(self, stream: IO[bytes], callback: Callable[[int], None]):
+        super().__init__()
+        self._stream = stream
+        self._callback = callback
+        self._size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self._stream.readinto(buffer)
+        self._size += size
+        self._callback(self._size)
+        return size
+
+
+class _ProgressThrottle:
+    """Limits the rate of progress notifications. An update is due if the
+    progress advanced by at least *min_step* or if *min_interval* seconds
+    passed since the last due update.
+    """
+
+    def __init__(self, min_step: float = 0.01, min_interval: float = 0.1):
+        self._min_step = min_step
+        self._min_interval = min_interval
+        self._last_progress = None
+        self._last_time = 0.0
+
+    def is_due(self, progress: float) -> bool:
+        now = time.monotonic()
+        if (
+            self._last_progress is None
+            or progress - self._last_progress >= self._min_step
+            or now - self._last_time >= self._min_interval
+        ):
+            self._last_progress = progress
+            self._last_time = now
+            return True
+        return False
+
+
+class _QueueReader(io.RawIOBase):
+    """Read-only stream of the chunks put into *chunks* by a producer thread.
+    The producer signals the end of the stream by ``None`` and failures by
+    putting the exception.
+    """
+
+    def __init__(self, chunks: queue.Queue):
+        super().__init__()
+        self._chunks = chunks
+        self._buffer = memoryview(b"")
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._buffer and not self._eof:
+            chunk = self._chunks.get()
+            if isinstance(chunk, BaseException):
+                raise chunk
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = memoryview(chunk)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+@contextmanager
+def _read_ahead(stream: IO[bytes], max_chunks: int = 4) -> Iterator[IO[bytes]]:
+    """Reads *stream* in a background thread, so that the consumer of the
+    yielded stream overlaps with the retrieval of up to *max_chunks* chunks.
+    """
+    chunks = queue.Queue(maxsize=max_chunks)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
+        try:
+            while not stop.is_set():
+                chunk = stream.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                put(chunk)
+        except Exception as error:
+            put(error)
+        finally:
+            put(None)
+
+    threading.Thread(target=produce, name="xcube-zenodo-download", daemon=True).start()
+    try:
+        yield _QueueReader(chunks)
+    finally:
+        # the producer stops at its next put(), if the consumer gives up early
+        stop.set()
 
 
 def _check_requests_response(response: requests.Response) -> None:
@@ -317,17 +802,60 @@ def _check_requests_response(response: requests.Response) -> None:
         raise DataStoreError(str(response.raise_for_status()))
 
 
-def recursive_listdir(fs: fsspec.AbstractFileSystem, path: str) -> list:
-    items = fs.listdir(path)
-    files = []
+def group_archive_members(members: Iterable[str]) -> dict[str, list[str]]:
+    """Groups the file members of an archive by the entries which
+    :func:`recursive_listdir` yields for the extracted archive, i.e. all
+    members of a Zarr directory are grouped under the directory.
+    Members with unsafe paths are skipped.
+    """
+    members = [
+        member
+        for member in members
+        if not member.startswith("/") and ".." not in member.split("/")
+    ]
+    zarr_dirs = {
+        member.rsplit("/", maxsplit=1)[0]
+        for member in members
+        if member.endswith("/.zattrs")
+    }
+    entries = {}
+    for member in members:
+        parts = member.split("/")
+        entry = member
+        for i in range(1, len(parts)):
+            parent = "/".join(parts[:i])
+            if parent in zarr_dirs:
+                entry = parent
+                break
+        entries.setdefault(entry, []).append(member)
+    return entries
 
-    for item in items:
-        if item["type"] == "directory":
-            if fs.exists(fs.sep.join([item["name"], ".zattrs"])):
-                files.append(item)
-            else:
-                files.extend(recursive_listdir(fs, item["name"]))
-        else:
-            files.append(item)
 
-    return files
+def recursive_listdir(fs: fsspec.AbstractFileSystem, path: str) -> list:
+    """Lists the files below *path*, where Zarr directories, identified by
+    their ``.zattrs`` file, are listed as one entry. The tree is fetched by a
+    single ``find`` call, which backends can serve in batches.
+    """
+    root = fs._strip_protocol(path).rstrip(fs.sep)
+    entries = fs.find(root, withdirs=True, detail=True)
+    zarr_dirs = {
+        name.rsplit(fs.sep, maxsplit=1)[0]
+        for name in entries
+        if name.endswith(f"{fs.sep}.zattrs")
+    }
+    zarr_dirs.discard(root)
+
+    def is_in_zarr_dir(name: str) -> bool:
+        parent = name.rsplit(fs.sep, maxsplit=1)[0]
+        while len(parent) > len(root):
+            if parent in zarr_dirs:
+                return True
+            parent = parent.rsplit(fs.sep, maxsplit=1)[0]
+        return False
+
+    return [
+        info
+        for name, info in entries.items()
+        if (info["type"] != "directory" or name in zarr_dirs)
+        and not is_in_zarr_dir(name)
+    ]
@@ -19,15 +19,21 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Any, Container, Iterator, Tuple
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Any, Container, Iterator, Sequence, Tuple
 
 import fsspec
 import requests
 import xarray as xr
 from xcube.core.store import (
+    DATASET_TYPE,
     DataDescriptor,
     DataStore,
     DataStoreError,
+    DataType,
     DataTypeLike,
     PreloadedDataStore,
     new_data_store,
@@ -40,64 +46,216 @@ from xcube.util.jsonschema import (
     JsonStringSchema,
 )
 
-from ._utils import identify_preload_file_format, is_supported_preload_file_format
-from .constants import CACHE_FOLDER_NAME, LOG
+from ._utils import (
+    identify_preload_file_format,
+    is_supported_preload_file_format,
+    new_http_session,
+)
+from .constants import BLOCK_CACHE_FOLDER_NAME, CACHE_FOLDER_NAME, LOG
 from .preload import ZenodoPreloadHandle
 
+_RECORD_FILES_TTL = 60  # seconds
+_MAX_PREFETCH_WORKERS = 8
+_MAX_DESCRIBE_WORKERS = 8
+# archive formats, which may contain a Zarr dataset that can be opened lazily
+_LAZY_FORMATS = ("zip", "tar", "tar.gz")
+
+
+# the parameter schemas do not depend on the store instance, so they are
+# built once
+_STORE_PARAMS_SCHEMA = JsonObjectSchema(
+    properties=dict(
+        root=JsonStringSchema(
+            title="Zenodo record ID",
+            description="The record ID can be found in the url.",
+        ),
+        cache_store_id=JsonStringSchema(
+            title="Store ID of cache data store.",
+            description=(
+                "Store ID of a filesystem-based data store implemented in xcube."
+            ),
+            default="file",
+        ),
+        cache_store_params=JsonObjectSchema(
+            title="Store parameters of cache data store.",
+            description=(
+                "Store parameters of a filesystem-based data store implemented "
+                "in xcube."
+            ),
+            default=dict(root=CACHE_FOLDER_NAME, max_depth=10),
+        ),
+        use_cache=JsonBooleanSchema(
+            title="Switch to cache the responses of the Zenodo API.",
+            description=(
+                "If True and the package 'requests-cache' is installed, "
+                "the file listing of the record is cached on disk for "
+                "one hour."
+            ),
+            default=True,
+        ),
+        use_block_cache=JsonBooleanSchema(
+            title="Switch to cache the blocks of lazily opened archives.",
+            description=(
+                "If True and the cache store is a 'file' data store, the "
+                "blocks of ZIP and TAR archives read by open_data are cached "
+                "in the folder '.blockcache' of the cache store root."
+            ),
+            default=True,
+        ),
+    ),
+    required=["root"],
+    additional_properties=False,
+)
+
+_PRELOAD_PARAMS_SCHEMA = JsonObjectSchema(
+    properties=dict(
+        blocking=JsonBooleanSchema(
+            title="Switch to make the preloading process blocking or non-blocking",
+            description="If True, the preloading process blocks the script.",
+            default=True,
+        ),
+        silent=JsonBooleanSchema(
+            title="Switch to visualize the preloading process.",
+            description=(
+                "If False, the preloading progress will be visualized in a table."
+                "If True, the visualization will be suppressed."
+            ),
+            default=True,
+        ),
+        max_workers=JsonIntegerSchema(
+            title="Maximum number of concurrent workers.",
+            description="Limits the number of parallel preload tasks.",
+            minimum=1,
+            default=4,
+        ),
+        target_format=JsonStringSchema(
+            title="Format of the preloaded dataset in the cache.",
+            description="If not given, native format is kept.",
+            enum=["zarr", "netcdf"],
+            default=None,
+        ),
+        chunks=JsonArraySchema(
+            title="Chunk sizes for each dimension.",
+            description=(
+                "An iterable with length same as number of dimensions. "
+                "Note this is only applied if `target_format is given."
+            ),
+            items=JsonIntegerSchema(),
+        ),
+        force_preload=JsonBooleanSchema(
+            title="Force preload, regardless if datasets are already preloaded.",
+            default=False,
+        ),
+    ),
+    required=[],
+    additional_properties=True,
+)
+
+_SEARCH_PARAMS_SCHEMA = JsonObjectSchema(
+    properties={},
+    required=[],
+    additional_properties=False,
+)
+
 
 class ZenodoDataStore(DataStore):
     """Implementation of the Zenodo data store defined in the ``xcube_zenodo``
     plugin."""
 
+    # data types supported by the HTTPS data store, see get_data_types()
+    _data_types: Tuple[str, ...] | None = None
+    # file listings of records fetched by prefetch_records(), by record ID
+    _prefetched_files: dict[str, tuple[float, list[dict]]] = {}
+
     def __init__(
         self,
         root: str,
         cache_store_id: str = "file",
         cache_store_params: dict = None,
+        use_cache: bool = True,
+        use_block_cache: bool = True,
     ):
         self._root = root
+        self._use_cache = use_cache
+        self._prune_prefetched_files()
+        self._files_cache = self._prefetched_files.pop(root, None)
+        self._consolidated_cache: dict[str, bool] = {}
         self._uri_root = f"zenodo.org/records/{root}/files"
-        self._https_data_store = new_data_store("https", root=self._uri_root)
         if cache_store_params is None:
             cache_store_params = dict(root=f"{CACHE_FOLDER_NAME}/{root}")
-        cache_store_params["max_depth"] = cache_store_params.pop("max_depth", 10)
-        self.cache_store: PreloadedDataStore = new_data_store(
-            cache_store_id, **cache_store_params
-        )
+        # copy the parameters, so that the caller's dict is not modified
+        cache_store_params = {"max_depth": 10, **cache_store_params}
+        self._cache_store_id = cache_store_id
+        self._cache_store_params = cache_store_params
+        # blocks are cached next to the preloaded data, so that they are
+        # removed together with it; fsspec caches blocks on local disk only
+        self._block_cache_path = None
+        if use_block_cache and cache_store_id == "file":
+            self._block_cache_path = os.path.join(
+                cache_store_params.get("root", ""), BLOCK_CACHE_FOLDER_NAME
+            )
+
+    # the session is created on first use, as a cached session opens its
+    # database on disk
+    @cached_property
+    def _session(self) -> requests.Session:
+        return new_http_session(use_cache=self._use_cache)
+
+    # the data stores are created on first use, as creating them instantiates
+    # their filesystems
+    @cached_property
+    def _https_data_store(self) -> DataStore:
+        return new_data_store("https", root=self._uri_root)
+
+    @cached_property
+    def cache_store(self) -> PreloadedDataStore:
+        return new_data_store(self._cache_store_id, **self._cache_store_params)
+
+    @classmethod
+    def prefetch_records(cls, *roots: str) -> None:
+        """Fetches the file listings of the given Zenodo records concurrently.
+        Stores created for these records within the next minute use the
+        prefetched listings instead of querying the Zenodo API themselves.
+
+        Args:
+            roots: The Zenodo record IDs.
+        """
+        if not roots:
+            return
+        with new_http_session() as session:
+            with ThreadPoolExecutor(
+                max_workers=min(_MAX_PREFETCH_WORKERS, len(roots))
+            ) as executor:
+                listings = executor.map(
+                    lambda root: (
+                        time.monotonic(),
+                        _fetch_record_files(session, root),
+                    ),
+                    roots,
+                )
+                cls._prefetched_files.update(zip(roots, listings))
+        cls._prune_prefetched_files()
+
+    @classmethod
+    def _prune_prefetched_files(cls) -> None:
+        # drop the listings of records, for which no store was created in time
+        now = time.monotonic()
+        for root, (fetch_time, _) in list(cls._prefetched_files.items()):
+            if now - fetch_time >= _RECORD_FILES_TTL:
+                cls._prefetched_files.pop(root, None)
 
     @classmethod
     def get_data_store_params_schema(cls) -> JsonObjectSchema:
-        params = dict(
-            root=JsonStringSchema(
-                title="Zenodo record ID",
-                description="The record ID can be found in the url.",
-            ),
-            cache_store_id=JsonStringSchema(
-                title="Store ID of cache data store.",
-                description=(
-                    "Store ID of a filesystem-based data store implemented in xcube."
-                ),
-                default="file",
-            ),
-            cache_store_params=JsonObjectSchema(
-                title="Store parameters of cache data store.",
-                description=(
-                    "Store parameters of a filesystem-based data store"
-                    "implemented in xcube."
-                ),
-                default=dict(root=CACHE_FOLDER_NAME, max_depth=10),
-            ),
-        )
-        return JsonObjectSchema(
-            properties=dict(**params),
-            required=["root"],
-            additional_properties=False,
-        )
+        return _STORE_PARAMS_SCHEMA
 
     @classmethod
     def get_data_types(cls) -> Tuple[str, ...]:
-        store = new_data_store("https", root="zenodo.org")
-        return store.get_data_types()
+        # the data types are the same for every store, so they are determined
+        # only once
+        if cls._data_types is None:
+            store = new_data_store("https", root="zenodo.org")
+            cls._data_types = store.get_data_types()
+        return cls._data_types
 
     def get_data_types_for_data(self, data_id: str) -> Tuple[str, ...]:
         return self._https_data_store.get_data_types_for_data(data_id)
@@ -105,12 +263,27 @@ class ZenodoDataStore(DataStore):
     def get_data_ids(
         self, data_type: DataTypeLike = None, include_attrs: Container[str] = None
     ) -> Iterator[str | tuple[str, dict[str, Any]] | None]:
-        files = self._get_files_from_record()
-        for file in files:
-            if self._https_data_store.has_data(
-                file["key"]
-            ) or is_supported_preload_file_format(file["key"]):
+        # the attributes are taken from the file entries of the Zenodo record,
+        # e.g. "size" or "checksum"
+        attr_names = tuple(include_attrs) if include_attrs is not None else None
+        # preloaded files are opened as datasets
+        preload_matches = True
+        if data_type is not None:
+            data_type = DataType.normalize(data_type)
+            preload_matches = data_type.is_super_type_of(DATASET_TYPE)
+            if not preload_matches and not any(
+                self.get_data_opener_ids(data_type=data_type)
+            ):
+                return
+        for file in self._get_files_from_record():
+            if not self._is_supported_file(file["key"], data_type, preload_matches):
+                continue
+            if attr_names is None:
                 yield file["key"]
+            else:
+                yield file["key"], {
+                    name: file[name] for name in attr_names if name in file
+                }
 
     def has_data(self, data_id: str, data_type: str = None) -> bool:
         return self._https_data_store.has_data(data_id=data_id, data_type=data_type)
@@ -122,6 +295,30 @@ class ZenodoDataStore(DataStore):
             data_id=data_id, data_type=data_type
         )
 
+    def describe_data_many(
+        self, data_ids: Sequence[str], data_type: DataTypeLike = None
+    ) -> list[DataDescriptor]:
+        """Describes several data resources concurrently.
+
+        Args:
+            data_ids: The data identifiers.
+            data_type: If given, the data type of the data resources.
+
+        Returns:
+            The data descriptors, in the order of *data_ids*.
+        """
+        if not data_ids:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(_MAX_DESCRIBE_WORKERS, len(data_ids))
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda data_id: self.describe_data(data_id, data_type=data_type),
+                    data_ids,
+                )
+            )
+
     def get_data_opener_ids(
         self, data_id: str = None, data_type: DataTypeLike = None
     ) -> Tuple[str, ...]:
@@ -140,15 +337,21 @@ class ZenodoDataStore(DataStore):
     def open_data(
         self, data_id: str, opener_id: str = None, **open_params
     ) -> xr.Dataset:
-        if is_supported_preload_file_format(data_id):
+        format_id = identify_preload_file_format(data_id)
+        if format_id is not None:
+            message = (
+                f"The dataset {data_id} is stored in a format that does not "
+                f"support lazy access. Please load it explicitly using "
+                f"store.preload_data({data_id!r}) first."
+            )
+            if format_id not in _LAZY_FORMATS:
+                raise DataStoreError(message)
             try:
-                return self._open_compressed_zarr(data_id, **open_params)
-            except Exception:
-                raise DataStoreError(
-                    f"The dataset {data_id} is stored in a format that does not "
-                    f"support lazy access. Please load it explicitly using "
-                    f"store.preload_data({data_id!r}) first."
-                ) from None
+                return self._open_compressed_zarr(
+                    data_id, format_id=format_id, **open_params
+                )
+            except Exception as e:
+                raise DataStoreError(message) from e
         else:
             return self._https_data_store.open_data(
                 data_id=data_id, opener_id=opener_id, **open_params
@@ -160,22 +363,27 @@ class ZenodoDataStore(DataStore):
 
         # this will load all data ids in the store
         if not data_ids:
-            files = self._get_files_from_record()
-            data_ids = []
-            for file in files:
-                if is_supported_preload_file_format(file["key"]):
-                    data_ids.append(file["key"])
+            data_ids = [
+                file["key"]
+                for file in self._get_files_from_record()
+                if is_supported_preload_file_format(file["key"])
+            ]
 
         data_ids_sel = []
+        rejected = []
         for data_id in data_ids:
             if is_supported_preload_file_format(data_id):
                 data_ids_sel.append(f"https://{self._uri_root}/{data_id}")
             else:
-                LOG.warning(
-                    f"{data_id} cannot be preloaded. Only 'nc', 'zip', 'tar', "
-                    "'tar.gz', and 'rar' compressed files are supported. The preload "
-                    "request is discarded."
-                )
+                rejected.append(data_id)
+        if rejected:
+            # a single warning for all rejected data IDs
+            LOG.warning(
+                f"{', '.join(rejected)} cannot be preloaded. Only 'nc', 'zip', "
+                "'tar', 'tar.gz', and 'rar' compressed files are supported. The "
+                f"preload request{'s are' if len(rejected) > 1 else ' is'} "
+                "discarded."
+            )
         self.cache_store.preload_handle = ZenodoPreloadHandle(
             self.cache_store,
             *data_ids_sel,
@@ -184,51 +392,7 @@ class ZenodoDataStore(DataStore):
         return self.cache_store
 
     def get_preload_data_params_schema(self) -> JsonObjectSchema:
-        params = dict(
-            blocking=JsonBooleanSchema(
-                title="Switch to make the preloading process blocking or "
-                "non-blocking",
-                description="If True, the preloading process blocks the script.",
-                default=True,
-            ),
-            silent=JsonBooleanSchema(
-                title="Switch to visualize the preloading process.",
-                description=(
-                    "If False, the preloading progress will be visualized in a table."
-                    "If True, the visualization will be suppressed."
-                ),
-                default=True,
-            ),
-            max_workers=JsonIntegerSchema(
-                title="Maximum number of concurrent workers.",
-                description="Limits the number of parallel preload tasks.",
-                minimum=1,
-                default=4,
-            ),
-            target_format=JsonStringSchema(
-                title="Format of the preloaded dataset in the cache.",
-                description="If not given, native format is kept.",
-                enum=["zarr", "netcdf"],
-                default=None,
-            ),
-            chunks=JsonArraySchema(
-                title="Chunk sizes for each dimension.",
-                description=(
-                    "An iterable with length same as number of dimensions. "
-                    "Note this is only applied if `target_format is given."
-                ),
-                items=JsonIntegerSchema(),
-            ),
-            force_preload=JsonBooleanSchema(
-                title="Force preload, regardless if datasets are already preloaded.",
-                default=False,
-            ),
-        )
-        return JsonObjectSchema(
-            properties=dict(**params),
-            required=[],
-            additional_properties=True,
-        )
+        return _PRELOAD_PARAMS_SCHEMA
 
     def search_data(self, data_type: DataTypeLike = None, **search_params):
         schema = self.get_search_params_schema()
@@ -239,36 +403,74 @@ class ZenodoDataStore(DataStore):
     def get_search_params_schema(
         cls, data_type: DataTypeLike = None
     ) -> JsonObjectSchema:
-        return JsonObjectSchema(
-            properties={},
-            required=[],
-            additional_properties=False,
-        )
+        return _SEARCH_PARAMS_SCHEMA
 
-    def _get_files_from_record(self):
-        url = f"https://zenodo.org/api/records/{self._root}"
-        response = requests.get(url)
-        return response.json().get("files", [])
+    def _is_supported_file(
+        self,
+        key: str,
+        data_type: DataType = None,
+        preload_matches: bool = True,
+    ) -> bool:
+        # the files of the record are known to exist, so instead of probing
+        # them via HTTP, only check for an opener matching the file extension
+        if is_supported_preload_file_format(key):
+            return preload_matches
+        try:
+            return any(self.get_data_opener_ids(data_id=key, data_type=data_type))
+        except DataStoreError:
+            return False
 
-    def _open_compressed_zarr(self, data_id: str, **open_params) -> xr.Dataset:
+    def _get_files_from_record(self) -> list[dict]:
+        # the file listing of a record rarely changes, so it is reused for a
+        # short time, e.g. by get_data_ids followed by preload_data
+        now = time.monotonic()
+        if self._files_cache is None or now - self._files_cache[0] >= _RECORD_FILES_TTL:
+            self._files_cache = (now, _fetch_record_files(self._session, self._root))
+        return self._files_cache[1]
+
+    def _open_compressed_zarr(
+        self, data_id: str, format_id: str = None, **open_params
+    ) -> xr.Dataset:
         uri = f"https://{self._uri_root}/{data_id}"
-        format_id = identify_preload_file_format(data_id)
+        if format_id is None:
+            format_id = identify_preload_file_format(data_id)
         if format_id == "zip":
-            mapper = fsspec.get_mapper(f"zip::{uri}")
+            protocol = "zip"
         elif format_id in ["tar", "tar.gz"]:
-            mapper = fsspec.get_mapper(f"tar::{uri}")
+            protocol = "tar"
         else:
             raise ValueError(
                 f"Dataset in {format_id!r} format cannot be opened lazily. "
                 "Download and extract the file first via `preload_data` method."
             )
-        group = data_id.replace(f".{format_id}", "")
+        # cache the blocks read from Zenodo on disk, so that the archive index
+        # and the Zarr metadata are not fetched again by subsequent opens;
+        # indexing a tar.gz archive reads all of it, which is not cached
+        if self._block_cache_path is not None and format_id != "tar.gz":
+            mapper = fsspec.get_mapper(
+                f"{protocol}::blockcache::{uri}",
+                blockcache=dict(cache_storage=self._block_cache_path),
+            )
+        else:
+            mapper = fsspec.get_mapper(f"{protocol}::{uri}")
+        group = data_id.removesuffix(f".{format_id}")
         if not group.endswith("zarr"):
             group = f"{group}.zarr"
+        # consolidated metadata is read with a single request, whereas otherwise
+        # the metadata of each array is read separately
+        consolidated = self._consolidated_cache.get(data_id)
+        if consolidated is None:
+            consolidated = f"{group}/.zmetadata" in mapper
+            self._consolidated_cache[data_id] = consolidated
         chunks = open_params.pop("chunks", {})
         return xr.open_dataset(
             mapper,
             engine="zarr",
-            **dict(consolidated=False, group=group, chunks=chunks),
+            **dict(consolidated=consolidated, group=group, chunks=chunks),
             **open_params,
         )
+
+
+def _fetch_record_files(session: requests.Session, root: str) -> list[dict]:
+    response = session.get(f"https://zenodo.org/api/records/{root}")
+    return response.json().get("files", [])